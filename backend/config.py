@@ -25,6 +25,13 @@ class Settings(BaseSettings):
     supabase_url: str
     supabase_anon_key: str
     supabase_service_key: str
+    # JWT secret (Supabase dashboard > API). When set, access tokens are
+    # verified locally instead of via a Supabase round-trip per request.
+    supabase_jwt_secret: Optional[str] = None
+    # Direct Postgres DSN (Supabase dashboard > Database > Connection
+    # string). When set, hot read endpoints bypass PostgREST and talk to
+    # Postgres over a pooled binary-protocol connection.
+    supabase_db_url: Optional[str] = None
     
     # OpenAI Configuration (via Emergent LLM Key)
     openai_api_key: str
@@ -36,6 +43,11 @@ class Settings(BaseSettings):
     frontend_url: str = "http://localhost:3000"
     admin_key: str = "admin-key-default"  # Change this in production!
     
+    # Matching Settings
+    # Embedding-based match scoring ("python" ~ "python3"). Off by
+    # default: exact skill overlap costs zero credits.
+    use_semantic_matching: bool = False
+
     # File Upload Settings
     max_resume_size_mb: int = 10
     allowed_resume_types: str = ".pdf,.doc,.docx"
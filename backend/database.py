@@ -13,10 +13,58 @@ Engineering Notes:
 
 from supabase import create_client, Client
 from config import settings
+from functools import lru_cache, partial
+import anyio.to_thread
+import asyncpg
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Dedicated thread budget for DB offload. anyio's default limiter caps
+# ALL to_thread work at 40 threads process-wide; with every PostgREST
+# call sharing that pool, DB round-trips would throttle (and be
+# throttled by) file parsing and storage uploads. The threads sit idle
+# on network I/O, so a higher cap is cheap. Created lazily - anyio
+# primitives need a running event loop.
+_DB_THREAD_LIMIT = 100
+_db_limiter = None
+
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Run a blocking supabase-py call in a worker thread.
+
+    supabase-py is synchronous; calling .execute() (or auth.get_user)
+    directly inside an async endpoint blocks the event loop for the full
+    network round-trip, serializing every in-flight request. Usage:
+
+        response = await run_db(query.execute)
+
+    Builder chains stay inline (pure URL construction, no I/O) - only
+    the terminal call is offloaded.
+    """
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = anyio.CapacityLimiter(_DB_THREAD_LIMIT)
+    return await anyio.to_thread.run_sync(partial(fn, *args, **kwargs), limiter=_db_limiter)
+
+
+@lru_cache(maxsize=512)
+def _user_client_for_token(access_token: str) -> Client:
+    """
+    One client per access token, reused across requests.
+
+    create_client performs config parsing and connection setup on every
+    call; caching per token keeps the HTTP connection pool warm for the
+    lifetime of the session instead of paying a TLS handshake per request.
+    """
+    client = create_client(
+        settings.supabase_url,
+        settings.supabase_anon_key
+    )
+    client.postgrest.auth(access_token)
+    return client
+
 
 class Database:
     """
@@ -39,12 +87,50 @@ class Database:
                 settings.supabase_anon_key
             )
             
+            # asyncpg pool for hot read paths - created lazily at app
+            # startup (needs a running event loop), None when no direct
+            # DSN is configured
+            self.pool: asyncpg.Pool = None
+
             logger.info("✅ Database clients initialized successfully")
-            
+
         except Exception as e:
-            logger.error(f"❌ Failed to initialize database: {e}")
+            logger.error("❌ Failed to initialize database: %s", e)
             raise
-    
+
+    async def init_pool(self) -> None:
+        """
+        Open the asyncpg pool for direct-to-Postgres queries.
+
+        PostgREST adds an HTTPS hop (TLS + HTTP framing + JSON) to every
+        query; the pool reuses binary-protocol connections and caches
+        prepared statements, so hot endpoints skip all of that. Optional:
+        without supabase_db_url everything stays on the supabase client.
+        """
+        if not settings.supabase_db_url:
+            logger.info("ℹ️ No supabase_db_url set - queries go through PostgREST")
+            return
+
+        try:
+            self.pool = await asyncpg.create_pool(
+                dsn=settings.supabase_db_url,
+                min_size=5,
+                max_size=20,
+                statement_cache_size=1024
+            )
+            logger.info("✅ asyncpg pool ready (direct Postgres for hot queries)")
+        except Exception as e:
+            # Pool is an optimization - fall back to PostgREST, don't
+            # block startup
+            logger.error("❌ asyncpg pool init failed, using PostgREST: %s", e)
+            self.pool = None
+
+    async def close_pool(self) -> None:
+        """Close the asyncpg pool on shutdown."""
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
     def get_admin_client(self) -> Client:
         """Get service role client for admin operations."""
         return self.admin_client
@@ -57,13 +143,9 @@ class Database:
             access_token: Optional Supabase user access token for RLS context
         """
         if access_token:
-            # Create a new client with user's access token for RLS
-            client = create_client(
-                settings.supabase_url,
-                settings.supabase_anon_key
-            )
-            client.auth.set_session(access_token, None)
-            return client
+            # Cached per token - reuses the client (and its connection
+            # pool) across requests in the same session
+            return _user_client_for_token(access_token)
         return self.anon_client
 
 
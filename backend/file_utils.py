@@ -11,16 +11,86 @@ Engineering Notes:
 - All file operations are logged and validated
 """
 
-import PyPDF2
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import pypdfium2 as pdfium
 import docx
+import html
 import io
 import logging
+import re
+import secrets
+import time
+import zipfile
+from functools import lru_cache
 from typing import Tuple, Optional
+from urllib.parse import quote
 from fastapi import UploadFile, HTTPException
 from config import settings
+from database import run_db
 
 logger = logging.getLogger(__name__)
 
+# AI parsing only uses the first ~4000 chars of extracted text, so stop
+# extracting once we have comfortably more than that. Avoids decoding
+# dozens of pages that would be thrown away anyway.
+MAX_EXTRACT_CHARS = 6000
+
+# Text runs inside word/document.xml - all we need from a .docx
+_DOCX_TEXT_RUN = re.compile(rb"<w:t[^>]*>([^<]*)</w:t>")
+
+# Sanitizer tables, compiled once: collapse runs of spaces/tabs and
+# blank lines, strip control chars (null bytes, vertical tabs, form
+# feeds) that PDF extraction commonly leaves behind. Every junk char
+# that survives is a billable token with no signal.
+_WS_RUN = re.compile(r"[ \t]+")
+_BLANK_RUN = re.compile(r"\n{3,}")
+_CTRL_CHARS = str.maketrans("", "", "\x00\x0b\x0c\x0e\x0f")
+
+
+# Process pool for text extraction: true multi-core parallelism for
+# concurrent uploads instead of serializing all CPU work under the GIL
+# in one worker. Created lazily so importing this module stays cheap.
+_extract_pool = None
+
+
+def _get_extract_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _extract_pool
+    if _extract_pool is None:
+        try:
+            mp_context = multiprocessing.get_context("forkserver")
+        except ValueError:
+            mp_context = multiprocessing.get_context("spawn")
+        _extract_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=mp_context
+        )
+        logger.info("✅ Extraction pool started (%s workers)", os.cpu_count())
+    return _extract_pool
+
+
+def _reset_extract_pool() -> None:
+    """Discard a broken pool so the next request rebuilds it."""
+    global _extract_pool
+    if _extract_pool is not None:
+        _extract_pool.shutdown(wait=False, cancel_futures=True)
+        _extract_pool = None
+        logger.warning("⚠️ Extraction pool broke - will rebuild on next upload")
+
+
+@lru_cache(maxsize=4096)
+def _public_object_url(bucket: str, file_path: str) -> str:
+    """
+    Build a Supabase public-object URL locally.
+
+    The public URL format is stable, so there's no reason to go through
+    an SDK call per file - this matters for feed responses that list
+    many resumes.
+    """
+    return f"{settings.supabase_url}/storage/v1/object/public/{bucket}/{quote(file_path)}"
+
 
 class FileProcessor:
     """
@@ -53,119 +123,228 @@ class FileProcessor:
         """
         try:
             file_extension = file.filename.split('.')[-1].lower()
-            logger.info(f"📄 Extracting text from {file.filename} (type: {file_extension})")
+            logger.info("📄 Extracting text from %s (type: %s)", file.filename, file_extension)
             
-            # Read file content
-            content = await file.read()
+            # Read file content, enforcing the size cap as we go
+            content = await FileProcessor.read_capped(file)
             
-            # Extract based on file type
-            if file_extension == 'pdf':
-                text = FileProcessor._extract_from_pdf(content)
-            elif file_extension in ['doc', 'docx']:
-                text = FileProcessor._extract_from_docx(content)
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unsupported file format: .{file_extension}. Please upload PDF or DOCX."
-                )
+            # Extract based on file type.
+            # Extraction is CPU-bound - run it in the process pool so
+            # concurrent uploads use all cores instead of contending for
+            # the GIL, and the event loop keeps serving other requests.
+            loop = asyncio.get_running_loop()
+            try:
+                if file_extension == 'pdf':
+                    text = await loop.run_in_executor(
+                        _get_extract_pool(), FileProcessor._extract_from_pdf, content)
+                elif file_extension in ['doc', 'docx']:
+                    text = await loop.run_in_executor(
+                        _get_extract_pool(), FileProcessor._extract_from_docx, content)
+                else:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Unsupported file format: .{file_extension}. Please upload PDF or DOCX."
+                    )
+            except concurrent.futures.process.BrokenProcessPool:
+                # A worker died mid-extraction (malformed PDFs can
+                # segfault pypdfium2) and the executor is unusable from
+                # here on - drop it so the next upload builds a fresh
+                # pool instead of 500ing forever
+                _reset_extract_pool()
+                raise
             
+            # Sanitize before the AI sees it: more informative tokens fit
+            # in the 4000-char parse window
+            text = FileProcessor._sanitize_text(text)
+
             if not text or len(text.strip()) < 100:
                 raise HTTPException(
                     status_code=400,
                     detail="Could not extract sufficient text from resume. Please ensure file is readable."
                 )
             
-            logger.info(f"✅ Extracted {len(text)} characters from resume")
+            logger.info("✅ Extracted %s characters from resume", len(text))
             return text
             
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"❌ Text extraction failed: {e}")
+            logger.error("❌ Text extraction failed: %s", e)
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to process resume: {str(e)}"
             )
     
+    @staticmethod
+    def _sanitize_text(text: str) -> str:
+        """
+        Clean extracted resume text before it is sent to GPT.
+
+        Strips control chars, collapses whitespace runs and blank-line
+        runs, and drops consecutive duplicate lines (repeated PDF
+        headers/footers). Pure string ops on pre-compiled tables.
+        """
+        text = _BLANK_RUN.sub("\n\n", _WS_RUN.sub(" ", text.translate(_CTRL_CHARS)))
+
+        # Dedupe consecutive identical lines (per-page headers/footers)
+        lines = []
+        previous = None
+        for line in text.split("\n"):
+            if line and line == previous:
+                continue
+            lines.append(line)
+            previous = line
+
+        return "\n".join(lines).strip()
+
     @staticmethod
     def _extract_from_pdf(content: bytes) -> str:
         """
         Extract text from PDF file.
-        
-        Uses PyPDF2 for local extraction (no API costs).
+
+        Uses pypdfium2 (native PDFium bindings) for local extraction -
+        no API costs and much faster than pure-Python parsers.
         """
         try:
-            pdf_file = io.BytesIO(content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            return text.strip()
-            
+            pdf = pdfium.PdfDocument(io.BytesIO(content))
+            try:
+                # Stream pages and stop once we have enough text for parsing
+                parts = []
+                total = 0
+                for page in pdf:
+                    textpage = page.get_textpage()
+                    page_text = textpage.get_text_range() or ""
+                    textpage.close()
+                    page.close()
+                    parts.append(page_text)
+                    total += len(page_text)
+                    if total >= MAX_EXTRACT_CHARS:
+                        break
+            finally:
+                pdf.close()
+
+            return "\n".join(parts).strip()
+
         except Exception as e:
-            logger.error(f"❌ PDF extraction failed: {e}")
+            logger.error("❌ PDF extraction failed: %s", e)
             raise Exception(f"Failed to extract text from PDF: {e}")
     
     @staticmethod
     def _extract_from_docx(content: bytes) -> str:
         """
         Extract text from DOCX file.
-        
-        Uses python-docx for local extraction (no API costs).
+
+        Fast path: a .docx is a zip - read word/document.xml directly and
+        regex out the <w:t> text runs. No DOM, no styles, no relationship
+        parsing. Falls back to python-docx for legacy .doc files or
+        unusual package layouts.
+        """
+        try:
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                document_xml = archive.read("word/document.xml")
+
+            parts = []
+            total = 0
+            for match in _DOCX_TEXT_RUN.finditer(document_xml):
+                run = match.group(1)
+                parts.append(run)
+                total += len(run)
+                if total >= MAX_EXTRACT_CHARS:
+                    break
+
+            # Word escapes &, < and > inside text runs - unescape so
+            # "Johnson &amp; Johnson" doesn't reach the parser verbatim
+            return html.unescape(b"\n".join(parts).decode("utf-8", "ignore")).strip()
+
+        except (zipfile.BadZipFile, KeyError):
+            # Not a real .docx package (e.g. legacy .doc) - use python-docx
+            return FileProcessor._extract_from_docx_slow(content)
+        except Exception as e:
+            logger.error("❌ DOCX extraction failed: %s", e)
+            raise Exception(f"Failed to extract text from DOCX: {e}")
+
+    @staticmethod
+    def _extract_from_docx_slow(content: bytes) -> str:
+        """
+        Extract text from DOCX/DOC via the full python-docx document
+        object. Slower fallback for files the zip fast path can't read.
         """
         try:
             docx_file = io.BytesIO(content)
             doc = docx.Document(docx_file)
-            
-            text = ""
+
+            # Stream paragraphs and stop once we have enough text for parsing
+            parts = []
+            total = 0
             for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            return text.strip()
-            
+                parts.append(paragraph.text)
+                total += len(paragraph.text)
+                if total >= MAX_EXTRACT_CHARS:
+                    break
+
+            return "\n".join(parts).strip()
+
         except Exception as e:
-            logger.error(f"❌ DOCX extraction failed: {e}")
+            logger.error("❌ DOCX extraction failed: %s", e)
             raise Exception(f"Failed to extract text from DOCX: {e}")
     
     @staticmethod
-    def validate_file_size(file: UploadFile) -> None:
+    async def read_capped(file: UploadFile, max_bytes: Optional[int] = None) -> bytes:
         """
-        Validate file size is within limits.
-        
+        Read an upload in chunks, rejecting it the moment it exceeds the
+        size limit - an oversized file is refused after reading at most
+        limit+1 chunks instead of being buffered whole into memory.
+
         Args:
             file: Uploaded file
-        
+            max_bytes: Size cap (defaults to settings.max_resume_size_mb)
+
+        Returns:
+            The complete file content
+
         Raises:
-            HTTPException: If file too large
+            HTTPException: 413 if the file exceeds the cap
         """
-        # Note: file.size might not be available in all cases
-        # Additional check in upload endpoint
-        max_size = settings.max_resume_size_mb * 1024 * 1024
-        logger.info(f"File size validation: max {settings.max_resume_size_mb}MB")
+        if max_bytes is None:
+            max_bytes = settings.max_resume_size_mb * 1024 * 1024
+
+        buf = bytearray()
+        while chunk := await file.read(1024 * 1024):
+            buf += chunk
+            if len(buf) > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File too large. Maximum size is {settings.max_resume_size_mb}MB."
+                )
+
+        return bytes(buf)
     
     @staticmethod
-    def validate_file_type(filename: str) -> None:
+    def validate_file_type(filename: str) -> str:
         """
         Validate file type is allowed.
-        
+
         Args:
             filename: Name of uploaded file
-        
+
+        Returns:
+            The validated file extension (without dot), so callers don't
+            re-split the filename
+
         Raises:
             HTTPException: If file type not allowed
         """
         allowed_types = settings.allowed_resume_types.split(',')
-        file_extension = '.' + filename.split('.')[-1].lower()
-        
-        if file_extension not in allowed_types:
+        file_extension = filename.split('.')[-1].lower()
+
+        if '.' + file_extension not in allowed_types:
             raise HTTPException(
                 status_code=400,
-                detail=f"File type {file_extension} not allowed. Allowed types: {allowed_types}"
+                detail=f"File type .{file_extension} not allowed. Allowed types: {allowed_types}"
             )
-        
-        logger.info(f"✅ File type {file_extension} is valid")
+
+        logger.info("✅ File type .%s is valid", file_extension)
+        return file_extension
 
 
 class StorageService:
@@ -186,53 +365,59 @@ class StorageService:
         """Initialize storage service with Supabase client."""
         self.client = supabase_client
         self.bucket_name = "resumes"  # Supabase storage bucket
-        logger.info(f"✅ Storage service initialized (bucket: {self.bucket_name})")
+        logger.info("✅ Storage service initialized (bucket: %s)", self.bucket_name)
     
-    async def upload_resume(self, user_id: str, file: UploadFile) -> Tuple[str, str]:
+    async def upload_resume(self, user_id: str, file: UploadFile,
+                            file_extension: Optional[str] = None) -> Tuple[str, str]:
         """
         Upload resume to storage.
-        
+
         Args:
             user_id: User ID for folder organization
             file: Resume file to upload
-        
+            file_extension: Extension already computed by
+                validate_file_type (derived from filename if omitted)
+
         Returns:
             Tuple of (file_path, public_url)
-        
+
         Engineering Notes:
         - Files organized by user_id for easy management
         - Generates unique filename to avoid collisions
         - Returns both storage path and public URL
         """
         try:
-            # Reset file pointer
+            # Reset file pointer and read with the size cap enforced
             await file.seek(0)
-            content = await file.read()
-            
-            # Generate unique file path
-            import uuid
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_extension = file.filename.split('.')[-1]
-            unique_filename = f"{user_id}/resume_{timestamp}_{uuid.uuid4().hex[:8]}.{file_extension}"
+            content = await FileProcessor.read_capped(file)
+
+            # Generate unique file path: integer timestamp + random hex
+            # beats strftime + uuid4 formatting on this hot path
+            if file_extension is None:
+                file_extension = file.filename.split('.')[-1]
+            unique_filename = f"{user_id}/resume_{int(time.time())}_{secrets.token_hex(4)}.{file_extension}"
             
-            logger.info(f"📁 Uploading resume to: {unique_filename}")
+            logger.info("📁 Uploading resume to: %s", unique_filename)
             
-            # Upload to Supabase Storage
-            response = self.client.storage.from_(self.bucket_name).upload(
+            # Upload to Supabase Storage (blocking SDK call - run in a
+            # worker thread so the event loop keeps serving requests)
+            response = await run_db(
+                self.client.storage.from_(self.bucket_name).upload,
                 path=unique_filename,
                 file=content,
                 file_options={"content-type": file.content_type}
             )
             
-            # Get public URL
-            public_url = self.client.storage.from_(self.bucket_name).get_public_url(unique_filename)
+            # Get public URL (pure string build, no SDK call)
+            public_url = _public_object_url(self.bucket_name, unique_filename)
             
-            logger.info(f"✅ Resume uploaded successfully: {unique_filename}")
+            logger.info("✅ Resume uploaded successfully: %s", unique_filename)
             return unique_filename, public_url
-            
+
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"❌ Resume upload failed: {e}")
+            logger.error("❌ Resume upload failed: %s", e)
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to upload resume: {str(e)}"
@@ -248,11 +433,7 @@ class StorageService:
         Returns:
             Public URL to access the file
         """
-        try:
-            return self.client.storage.from_(self.bucket_name).get_public_url(file_path)
-        except Exception as e:
-            logger.error(f"❌ Failed to get resume URL: {e}")
-            return ""
+        return _public_object_url(self.bucket_name, file_path)
     
     async def delete_resume(self, file_path: str) -> bool:
         """
@@ -265,12 +446,13 @@ class StorageService:
             True if deleted successfully
         """
         try:
-            self.client.storage.from_(self.bucket_name).remove([file_path])
-            logger.info(f"✅ Resume deleted: {file_path}")
+            await run_db(self.client.storage.from_(self.bucket_name).remove, [file_path])
+            logger.info("✅ Resume deleted: %s", file_path)
             return True
         except Exception as e:
-            logger.error(f"❌ Resume deletion failed: {e}")
+            logger.error("❌ Resume deletion failed: %s", e)
             return False
 
 
-# Note: StorageService instance will be created per request with appropriate Supabase client
+# Note: server.py holds a single StorageService instance (admin client);
+# the service is stateless beyond its client, so sharing it is safe
@@ -11,10 +11,36 @@ Engineering Notes:
 - JSON fields use dict/list types for flexibility
 """
 
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
 from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 from enum import Enum
+import sys
+
+# Shared pool of canonical skill strings. Skills are short and heavily
+# repeated ("python", "react", "aws" appear on thousands of profiles and
+# jobs), so interning collapses every occurrence to one object and
+# makes set intersections pointer comparisons.
+SKILL_POOL: Dict[str, str] = {}
+
+
+def _canon_skill(s: str) -> str:
+    """Canonicalize one skill string and intern it in the shared pool."""
+    key = s.lower().strip()
+    return SKILL_POOL.setdefault(key, sys.intern(key))
+
+
+def canonicalize_skills(value):
+    """
+    Normalize a skill/requirement list: lowercase, strip, drop empties,
+    dedupe (order-preserving), intern.
+
+    Doing this once at write time means match scoring can use raw set
+    intersections instead of re-normalizing every string on every read.
+    """
+    if not value:
+        return value
+    return list(dict.fromkeys(_canon_skill(s) for s in value if s and s.strip()))
 
 
 class UserRole(str, Enum):
@@ -75,6 +101,8 @@ class SeekerProfileBase(BaseModel):
     experience: Optional[str] = Field(None, description="Years of experience")
     skills: Optional[List[str]] = Field(default_factory=list)
 
+    _canon_skills = field_validator("skills", mode="before")(canonicalize_skills)
+
 
 class SeekerProfileCreate(SeekerProfileBase):
     """Create seeker profile."""
@@ -128,6 +156,8 @@ class ParsedResumeData(BaseModel):
     certifications: Optional[List[str]] = Field(default_factory=list)
     ats_score: Optional[float] = Field(None, description="ATS compatibility score 0-100")
 
+    _canon_skills = field_validator("skills", mode="before")(canonicalize_skills)
+
 
 class ResumeParseResponse(BaseModel):
     """Response after resume parsing."""
@@ -158,6 +188,8 @@ class JobBase(BaseModel):
     requirements: List[str] = Field(default_factory=list, description="Required skills/qualifications")
     logo: Optional[str] = Field(None, description="Company logo URL")
 
+    _canon_requirements = field_validator("requirements", mode="before")(canonicalize_skills)
+
 
 class JobCreate(JobBase):
     """Create job listing (recruiter only)."""
@@ -175,6 +207,8 @@ class JobUpdate(BaseModel):
     logo: Optional[str] = None
     status: Optional[Literal["draft", "active", "closed"]] = None
 
+    _canon_requirements = field_validator("requirements", mode="before")(canonicalize_skills)
+
 
 class JobResponse(JobBase):
     """Job listing response."""
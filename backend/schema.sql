@@ -63,6 +63,9 @@ CREATE POLICY "Users can update own seeker profile" ON seeker_profiles
 CREATE POLICY "Users can insert own seeker profile" ON seeker_profiles
     FOR INSERT WITH CHECK (auth.uid() = user_id);
 
+-- Candidate feed: only confirmed profiles are ever listed
+CREATE INDEX IF NOT EXISTS idx_seeker_profiles_confirmed ON seeker_profiles(resume_status) WHERE resume_status = 'confirmed';
+
 -- Recruiters can view confirmed seeker profiles
 CREATE POLICY "Recruiters can view confirmed seekers" ON seeker_profiles
     FOR SELECT USING (
@@ -99,6 +102,9 @@ CREATE POLICY "Users can insert own resumes" ON resumes
 CREATE POLICY "Users can update own resumes" ON resumes
     FOR UPDATE USING (auth.uid() = seeker_id);
 
+-- Index for the embedded resumes lookup in profile fetches
+CREATE INDEX IF NOT EXISTS idx_resumes_seeker ON resumes(seeker_id);
+
 
 -- ============== Jobs Table ==============
 -- Job listings posted by recruiters
@@ -133,6 +139,11 @@ CREATE POLICY "Recruiters can update own jobs" ON jobs
 CREATE POLICY "Recruiters can delete own jobs" ON jobs
     FOR DELETE USING (auth.uid() = recruiter_id);
 
+-- Recruiter's open jobs (job management + reciprocal-match lookup)
+CREATE INDEX IF NOT EXISTS idx_jobs_recruiter_open ON jobs(recruiter_id) WHERE status <> 'closed';
+-- Active-jobs feed scan ordered by recency
+CREATE INDEX IF NOT EXISTS idx_jobs_active_created ON jobs(created_at DESC) WHERE status = 'active';
+
 -- Seekers can view active jobs
 CREATE POLICY "Seekers can view active jobs" ON jobs
     FOR SELECT USING (
@@ -154,10 +165,17 @@ CREATE TABLE IF NOT EXISTS swipes (
     target_id UUID NOT NULL,
     target_type TEXT NOT NULL CHECK (target_type IN ('job', 'candidate')),
     direction TEXT NOT NULL CHECK (direction IN ('left', 'right')),
+    -- Denormalized from jobs.recruiter_id for job-target swipes (filled
+    -- by the set_swipe_recruiter_id trigger below) so match detection
+    -- never has to touch the jobs table
+    recruiter_id UUID,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     UNIQUE(swiper_id, target_id, target_type)
 );
 
+-- Existing deployments: CREATE TABLE IF NOT EXISTS skips the new column
+ALTER TABLE swipes ADD COLUMN IF NOT EXISTS recruiter_id UUID;
+
 ALTER TABLE swipes ENABLE ROW LEVEL SECURITY;
 
 CREATE POLICY "Users can view own swipes" ON swipes
@@ -170,6 +188,34 @@ CREATE POLICY "Users can insert own swipes" ON swipes
 CREATE INDEX IF NOT EXISTS idx_swipes_swiper ON swipes(swiper_id);
 CREATE INDEX IF NOT EXISTS idx_swipes_target ON swipes(target_id);
 
+-- Composite indexes backing the hot filter chains. Without these the
+-- feed exclusions and reciprocal-match checks degrade to seq scans as
+-- swipes grows.
+-- Feed filters: swipes(swiper_id, target_type) -> target_id
+CREATE INDEX IF NOT EXISTS idx_swipes_swiper_type_target ON swipes(swiper_id, target_type, target_id);
+-- Reciprocal-match probe in record_swipe
+CREATE INDEX IF NOT EXISTS idx_swipes_reciprocal ON swipes(swiper_id, target_id, target_type, direction);
+-- "Did this candidate right-swipe any of recruiter X's jobs" via the
+-- denormalized column, without joining jobs
+CREATE INDEX IF NOT EXISTS idx_swipes_swiper_recruiter ON swipes(swiper_id, recruiter_id) WHERE recruiter_id IS NOT NULL;
+
+-- Stamp jobs.recruiter_id onto each job-target swipe at insert time;
+-- one indexed point lookup here removes the jobs query from every
+-- reciprocal-match check
+CREATE OR REPLACE FUNCTION set_swipe_recruiter_id()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.target_type = 'job' AND NEW.recruiter_id IS NULL THEN
+        SELECT j.recruiter_id INTO NEW.recruiter_id
+        FROM jobs j WHERE j.id = NEW.target_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER set_swipes_recruiter_id BEFORE INSERT ON swipes
+    FOR EACH ROW EXECUTE FUNCTION set_swipe_recruiter_id();
+
 
 -- ============== Matches Table ==============
 -- Records mutual interest matches
@@ -205,6 +251,18 @@ CREATE INDEX IF NOT EXISTS idx_matches_seeker ON matches(seeker_id);
 CREATE INDEX IF NOT EXISTS idx_matches_recruiter ON matches(recruiter_id);
 
 
+-- ============== Resume Parse Cache Table ==============
+-- Caches AI parse results keyed by content hash (credit protection)
+-- Key covers model + prompt version + resume text, so prompt changes
+-- invalidate cleanly. No RLS: backend-only table, never exposed to users.
+
+CREATE TABLE IF NOT EXISTS resume_parse_cache (
+    hash TEXT PRIMARY KEY,
+    parsed_json JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+
 -- ============== Storage Bucket ==============
 -- Create storage bucket for resumes (run this in Storage section of Supabase dashboard)
 -- Bucket name: resumes
@@ -222,6 +280,72 @@ CREATE INDEX IF NOT EXISTS idx_matches_recruiter ON matches(recruiter_id);
 
 -- ============== Functions & Triggers ==============
 
+-- Record a swipe and detect a reciprocal match in one transaction.
+-- Replaces up to four serial round-trips from the backend (insert swipe,
+-- job lookup, reciprocal lookup, insert match) with a single RPC, and
+-- closes the race where two simultaneous right-swipes both miss the
+-- reciprocal row.
+CREATE OR REPLACE FUNCTION record_swipe_and_match(
+    p_swiper_id UUID,
+    p_target_id UUID,
+    p_target_type TEXT,
+    p_direction TEXT
+) RETURNS TABLE (swipe_id UUID, is_match BOOLEAN, match_id UUID) AS $$
+DECLARE
+    v_swipe_id UUID;
+    v_match_id UUID;
+    v_recruiter_id UUID;
+    v_job_id UUID;
+BEGIN
+    -- recruiter_id is stamped by the set_swipes_recruiter_id trigger,
+    -- so no separate jobs lookup is needed below
+    INSERT INTO swipes (swiper_id, target_id, target_type, direction)
+    VALUES (p_swiper_id, p_target_id, p_target_type, p_direction)
+    RETURNING id, recruiter_id INTO v_swipe_id, v_recruiter_id;
+
+    IF p_direction = 'right' THEN
+        IF p_target_type = 'job' THEN
+            -- Seeker right-swiped a job: match if the job's recruiter
+            -- already right-swiped this seeker
+            IF v_recruiter_id IS NOT NULL AND EXISTS (
+                SELECT 1 FROM swipes s
+                WHERE s.swiper_id = v_recruiter_id
+                  AND s.target_id = p_swiper_id
+                  AND s.target_type = 'candidate'
+                  AND s.direction = 'right'
+            ) THEN
+                INSERT INTO matches (seeker_id, recruiter_id, job_id, status)
+                VALUES (p_swiper_id, v_recruiter_id, p_target_id, 'active')
+                ON CONFLICT (seeker_id, recruiter_id, job_id)
+                    DO UPDATE SET status = 'active'
+                RETURNING id INTO v_match_id;
+            END IF;
+
+        ELSIF p_target_type = 'candidate' THEN
+            -- Recruiter right-swiped a candidate: match on the first of
+            -- the recruiter's jobs the candidate right-swiped
+            SELECT s.target_id INTO v_job_id
+            FROM swipes s
+            WHERE s.swiper_id = p_target_id
+              AND s.recruiter_id = p_swiper_id
+              AND s.target_type = 'job'
+              AND s.direction = 'right'
+            LIMIT 1;
+
+            IF v_job_id IS NOT NULL THEN
+                INSERT INTO matches (seeker_id, recruiter_id, job_id, status)
+                VALUES (p_target_id, p_swiper_id, v_job_id, 'active')
+                ON CONFLICT (seeker_id, recruiter_id, job_id)
+                    DO UPDATE SET status = 'active'
+                RETURNING id INTO v_match_id;
+            END IF;
+        END IF;
+    END IF;
+
+    RETURN QUERY SELECT v_swipe_id, v_match_id IS NOT NULL, v_match_id;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -242,6 +366,49 @@ CREATE TRIGGER update_jobs_updated_at BEFORE UPDATE ON jobs
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 
+-- ============== One-Time Backfill: Canonical Skills ==============
+-- Skills and requirements are canonicalized (lowercase, trimmed,
+-- deduped) at write time by the API models, and match scoring
+-- intersects the raw arrays. Rows written before that change still
+-- hold mixed-case values and would silently score 0, so normalize them
+-- in place. The WHERE guard keeps the statements idempotent - rows
+-- already canonical are untouched on re-runs.
+
+UPDATE seeker_profiles
+SET skills = (
+    SELECT COALESCE(array_agg(DISTINCT lower(trim(s))), '{}')
+    FROM unnest(skills) AS s
+    WHERE trim(s) <> ''
+)
+WHERE skills IS NOT NULL
+  AND EXISTS (
+      SELECT 1 FROM unnest(skills) AS s
+      WHERE s <> lower(trim(s)) OR trim(s) = ''
+  );
+
+UPDATE jobs
+SET requirements = (
+    SELECT COALESCE(array_agg(DISTINCT lower(trim(r))), '{}')
+    FROM unnest(requirements) AS r
+    WHERE trim(r) <> ''
+)
+WHERE requirements IS NOT NULL
+  AND EXISTS (
+      SELECT 1 FROM unnest(requirements) AS r
+      WHERE r <> lower(trim(r)) OR trim(r) = ''
+  );
+
+-- Job swipes recorded before the recruiter_id column existed are NULL,
+-- and the candidate branch of record_swipe_and_match matches on the
+-- denormalized column alone - without this they can never match.
+UPDATE swipes
+SET recruiter_id = j.recruiter_id
+FROM jobs j
+WHERE swipes.target_type = 'job'
+  AND swipes.recruiter_id IS NULL
+  AND j.id = swipes.target_id;
+
+
 -- ============== Sample Data (Optional) ==============
 -- Uncomment to insert sample data for testing
 
@@ -20,15 +20,21 @@ Engineering Notes:
 
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Header, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from typing import Optional, List
+import asyncio
+import jwt
 import logging
 import sys
+import time
+import zlib
+from functools import lru_cache
+from urllib.parse import quote
 from datetime import datetime
 
 # Import our modules
 from config import settings
-from database import db
+from database import db, run_db
 from models import (
     ProfileCreate, ProfileResponse,
     SeekerProfileCreate, SeekerProfileUpdate, SeekerProfileResponse,
@@ -36,11 +42,14 @@ from models import (
     JobCreate, JobUpdate, JobResponse,
     SwipeRequest, SwipeResponse,
     MatchResponse, CandidateResponse,
-    UserRole, ResumeStatus
+    UserRole, ResumeStatus, canonicalize_skills
 )
 from ai_service import ai_service
 from file_utils import FileProcessor, StorageService
 
+# Single shared storage service (stateless beyond its client)
+storage_service = StorageService(db.admin_client)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -56,7 +65,10 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="SuperhireX API",
     description="Swipe-based job matching platform backend",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson serializes responses in C (datetime/UUID handled natively) -
+    # matters for list endpoints like the job and candidate feeds
+    default_response_class=ORJSONResponse
 )
 
 # CORS Configuration
@@ -78,8 +90,8 @@ app.add_middleware(
 )
 
 logger.info("SuperhireX Backend starting...")
-logger.info(f"Environment: {settings.environment}")
-logger.info(f"Port: {settings.backend_port}")
+logger.info("Environment: %s", settings.environment)
+logger.info("Port: %s", settings.backend_port)
 
 # 🧪 DEMO MODE - For testing without Supabase auth
 DEMO_MODE = False
@@ -115,14 +127,28 @@ async def get_current_user_id(authorization: Optional[str] = Header(None)) -> st
     
     # 🧪 DEMO MODE - Allow demo tokens for testing
     if DEMO_MODE and token.startswith("demo-token-"):
-        logger.info(f"🧪 DEMO MODE - Using demo token: {token}")
+        logger.info("🧪 DEMO MODE - Using demo token: %s", token)
         # Extract user ID from demo token (format: demo-token-<user-id>)
         user_id = token.replace("demo-token-", "")
         return user_id
     
+    # Fast path: verify the JWT locally. Fully offline (HMAC check +
+    # exp validation), so the common case costs no network at all.
+    if settings.supabase_jwt_secret:
+        try:
+            claims = jwt.decode(
+                token,
+                settings.supabase_jwt_secret,
+                algorithms=["HS256"],
+                audience="authenticated"
+            )
+            return claims["sub"]
+        except jwt.InvalidTokenError as e:
+            logger.warning("⚠️ Local JWT verification failed (%s), falling back to Supabase", e)
+
     try:
         # Verify token with Supabase
-        user = db.admin_client.auth.get_user(token)
+        user = await run_db(db.admin_client.auth.get_user, token)
         if not user or not user.user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -132,13 +158,144 @@ async def get_current_user_id(authorization: Optional[str] = Header(None)) -> st
         return user.user.id
     
     except Exception as e:
-        logger.error(f"❌ Auth failed: {e}")
+        logger.error("❌ Auth failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication failed"
         )
 
 
+# ============== Avatar URLs ==============
+
+# Background colors for generated avatars/logos. The color is picked by
+# a deterministic hash of the name (crc32 - hash() is salted per
+# process), so the same name always yields the same URL and the browser
+# can cache the rendered image instead of refetching one per card.
+_AVATAR_PALETTE = ("0D8ABC", "7C3AED", "DB2777", "059669", "D97706", "DC2626", "2563EB", "475569")
+
+
+@lru_cache(maxsize=4096)
+def _avatar_url(name: str) -> str:
+    """Stable ui-avatars URL for a display name (URL-quoted)."""
+    color = _AVATAR_PALETTE[zlib.crc32(name.encode("utf-8")) % len(_AVATAR_PALETTE)]
+    return f"https://ui-avatars.com/api/?name={quote(name)}&background={color}"
+
+
+# ============== Role Lookup Cache ==============
+
+# user_id -> (role, expires_at monotonic). Roles never change in
+# practice, so a short TTL removes the profiles SELECT that several
+# endpoints repeat per request while still converging quickly if a role
+# ever is edited.
+_ROLE_TTL_SECONDS = 300
+_ROLE_CACHE_MAX = 10_000
+_role_cache: dict = {}
+
+
+async def get_role(user_id: str) -> Optional[str]:
+    """
+    Get the user's role ('SEEKER'/'RECRUITER'), cached with a TTL.
+
+    Returns None when no profile exists. Steady-state hit rate is ~100%,
+    so this is one fewer round-trip on every role-gated endpoint.
+    """
+    now = time.monotonic()
+    hit = _role_cache.get(user_id)
+    if hit and hit[1] > now:
+        return hit[0]
+
+    response = await run_db(db.admin_client.table("profiles").select("role").eq("id", user_id).maybe_single().execute)
+    role = response.data["role"] if response and response.data else None
+    if role is not None:
+        if len(_role_cache) >= _ROLE_CACHE_MAX:
+            _role_cache.clear()  # Simple bound: cheap and rare
+        _role_cache[user_id] = (role, now + _ROLE_TTL_SECONDS)
+    return role
+
+
+# ============== Direct SQL Fast Paths ==============
+# Used by the hottest read endpoints when the asyncpg pool is available
+# (supabase_db_url set). Same data as the PostgREST queries below, minus
+# the per-request TLS + HTTP + JSON overhead. UUIDs are cast to text so
+# rows drop straight into the response models.
+
+_PROFILE_SQL = """
+    SELECT p.id::text AS id, p.user_id::text AS user_id, p.full_name,
+           p.email, p.role, p.is_premium, p.created_at, p.updated_at,
+           sp.resume_status AS seeker_resume_status,
+           EXISTS (SELECT 1 FROM resumes r WHERE r.seeker_id = p.id) AS has_resume
+    FROM profiles p
+    LEFT JOIN seeker_profiles sp ON sp.user_id = p.id
+    WHERE p.id = $1::uuid
+"""
+
+_RESUME_STATUS_SQL = """
+    SELECT resume_status, ats_score
+    FROM seeker_profiles
+    WHERE user_id = $1::uuid
+"""
+
+_SEEKER_SKILLS_SQL = """
+    SELECT skills FROM seeker_profiles WHERE user_id = $1::uuid
+"""
+
+# Ranked feed, entirely in the database: the swipes anti-join, the skill
+# overlap (requirements and seeker skills are both canonicalized
+# lowercase at write time - see models.canonicalize_skills) and the
+# match score all happen in one indexed query, so Python only formats
+# the match reason for the rows it actually returns. Scoring mirrors
+# ai_service.calculate_job_match: % of requirements matched, neutral 50
+# when either side is empty.
+_JOB_FEED_SQL = """
+    WITH feed AS (
+        SELECT j.*,
+               ARRAY(SELECT unnest(j.requirements)
+                     INTERSECT
+                     SELECT unnest($2::text[])) AS overlap_skills
+        FROM jobs j
+        WHERE j.status = 'active'
+          AND NOT EXISTS (
+              SELECT 1 FROM swipes s
+              WHERE s.swiper_id = $1::uuid
+                AND s.target_type = 'job'
+                AND s.target_id = j.id
+          )
+    )
+    SELECT id::text AS id, recruiter_id::text AS recruiter_id,
+           title, company, location, salary, description, requirements,
+           logo, status, created_at, updated_at, overlap_skills,
+           CASE
+               WHEN cardinality(requirements) = 0 OR cardinality($2::text[]) = 0
+               THEN 50.0
+               ELSE least(100.0, cardinality(overlap_skills)::float * 100 / cardinality(requirements))
+           END AS match_score
+    FROM feed
+    ORDER BY match_score DESC, created_at DESC
+    LIMIT $3
+"""
+
+# Candidate feed for recruiters, same shape as the job feed: the
+# confirmed-profile filter, the swipes anti-join and the profile name
+# join run as one indexed query, so exactly `limit` candidate cards come
+# back instead of the full table minus a Python-side filter.
+_CANDIDATE_FEED_SQL = """
+    SELECT sp.id::text AS id, sp.user_id::text AS user_id,
+           sp.title, sp.bio, sp.location, sp.experience, sp.skills,
+           sp.ats_score::float AS ats_score, p.full_name
+    FROM seeker_profiles sp
+    JOIN profiles p ON p.id = sp.user_id
+    WHERE sp.resume_status = 'confirmed'
+      AND NOT EXISTS (
+          SELECT 1 FROM swipes s
+          WHERE s.swiper_id = $1::uuid
+            AND s.target_type = 'candidate'
+            AND s.target_id = sp.id
+      )
+    ORDER BY sp.created_at DESC
+    LIMIT $2
+"""
+
+
 # ============== Health Check ==============
 
 @app.get("/api/health")
@@ -161,37 +318,54 @@ async def get_profile(user_id: str = Depends(get_current_user_id)):
     Called after login to fetch user profile data.
     """
     try:
-        response = db.admin_client.table("profiles").select("*").eq("id", user_id).execute()
-        
+        if db.pool:
+            # Direct Postgres: one pooled binary-protocol query
+            row = await db.pool.fetchrow(_PROFILE_SQL, user_id)
+            if not row:
+                raise HTTPException(status_code=404, detail="Profile not found")
+
+            profile = dict(row)
+            seeker_status = profile.pop("seeker_resume_status")
+            has_resume = profile.pop("has_resume")
+            if profile.get("role") == "SEEKER":
+                profile["resume_status"] = seeker_status or "pending"
+                profile["has_resume"] = has_resume
+            return profile
+
+        # One embedded select instead of three sequential round-trips:
+        # related seeker_profiles/resumes rows come back in the same hop
+        response = await run_db(db.admin_client.table("profiles").select(
+            "*, seeker_profiles(resume_status), resumes(id)"
+        ).eq("id", user_id).execute)
+
         if not response.data or len(response.data) == 0:
             raise HTTPException(status_code=404, detail="Profile not found")
-        
+
         profile = response.data[0]
-        logger.info(f"Profile fetched: {profile}")
-        
-        # For seekers, also fetch resume status and check if they have a resume
+        seeker_rows = profile.pop("seeker_profiles", None) or []
+        resume_rows = profile.pop("resumes", None) or []
+        logger.debug("Profile fetched: %s", profile)
+
+        # For seekers, derive resume status and resume presence from the
+        # embedded rows
         if profile.get("role") == "SEEKER":
-            seeker_response = db.admin_client.table("seeker_profiles").select("resume_status").eq("user_id", user_id).execute()
-            logger.info(f"Seeker profile response: {seeker_response.data}")
-            
-            if seeker_response.data:
-                profile["resume_status"] = seeker_response.data[0].get("resume_status")
+            if seeker_rows:
+                # PostgREST returns an object (not a list) when it
+                # detects the one-to-one relationship via the UNIQUE
+                # constraint on seeker_profiles.user_id
+                seeker_row = seeker_rows[0] if isinstance(seeker_rows, list) else seeker_rows
+                profile["resume_status"] = seeker_row.get("resume_status")
             else:
                 profile["resume_status"] = "pending"
-                logger.info(f"No seeker_profile found, setting status to pending")
-            
-            # Check if they have uploaded a resume
-            resume_response = db.admin_client.table("resumes").select("id").eq("seeker_id", user_id).execute()
-            logger.info(f"Resume check - seeker_id: {user_id}, found: {len(resume_response.data)} resumes")
-            profile["has_resume"] = len(resume_response.data) > 0
-        
-        logger.info(f"Final profile with has_resume: {profile.get('has_resume')}")
+            profile["has_resume"] = len(resume_rows) > 0
+
+        logger.debug("Final profile with has_resume: %s", profile.get('has_resume'))
         return profile
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Get profile failed: {e}")
+        logger.error("Get profile failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -209,17 +383,20 @@ async def check_email_exists(request_data: dict):
         if not email:
             return {"profile_exists": False}
         
-        # Query profiles table for this email
-        response = db.admin_client.table("profiles").select("id").eq("email", email).limit(1).execute()
-        
-        profile_exists = len(response.data) > 0
+        # HEAD + count: the server answers with a count header only,
+        # no row payload to serialize or parse
+        response = await run_db(db.admin_client.table("profiles").select(
+            "id", count="exact", head=True
+        ).eq("email", email).execute)
+
+        profile_exists = bool(response.count)
         
-        logger.info(f"📧 Email check: {email} - Exists: {profile_exists}")
+        logger.info("📧 Email check: %s - Exists: %s", email, profile_exists)
         
         return {"profile_exists": profile_exists}
     
     except Exception as e:
-        logger.error(f"❌ Email check failed: {e}")
+        logger.error("❌ Email check failed: %s", e)
         # Return False on error to not break signup flow
         return {"profile_exists": False}
 
@@ -241,26 +418,24 @@ async def create_or_update_profile(
             "user_id": user_id,
             "full_name": profile.full_name,
             "email": profile.email,
-            "role": profile.role.value,
-            "updated_at": datetime.now().isoformat()
+            "role": profile.role.value
         }
         
-        response = db.admin_client.table("profiles").upsert(profile_data).execute()
+        response = await run_db(db.admin_client.table("profiles").upsert(profile_data).execute)
         
         # If seeker, create seeker_profile
         if profile.role == UserRole.SEEKER:
             seeker_profile = {
                 "user_id": user_id,
-                "resume_status": ResumeStatus.PENDING.value,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "resume_status": ResumeStatus.PENDING.value
             }
-            db.admin_client.table("seeker_profiles").upsert(seeker_profile).execute()
+            # Result unused - skip the row echo in the response
+            await run_db(db.admin_client.table("seeker_profiles").upsert(seeker_profile, returning="minimal").execute)
         
         return response.data[0]
     
     except Exception as e:
-        logger.error(f"❌ Create profile failed: {e}")
+        logger.error("❌ Create profile failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -286,19 +461,19 @@ async def upload_resume(
     - User can trigger parsing via /api/resume/parse
     """
     try:
-        logger.info(f"📤 Resume upload started for user {user_id}")
+        logger.info("📤 Resume upload started for user %s", user_id)
         
-        # Validate file
-        FileProcessor.validate_file_type(file.filename)
+        # Validate file (returns the extension for reuse downstream)
+        file_extension = FileProcessor.validate_file_type(file.filename)
         
         # 🧪 DEMO MODE - Skip database operations for testing
         if DEMO_MODE and user_id.startswith('demo-'):
-            logger.info(f"🧪 DEMO MODE - Skipping storage and database, using fake data")
+            logger.info("🧪 DEMO MODE - Skipping storage and database, using fake data")
             file_path = f"demo/{user_id}/{file.filename}"
             public_url = f"https://demo.example.com/{file_path}"
             resume_id = f"demo-resume-{int(__import__('time').time() * 1000)}"
             
-            logger.info(f"✅ Resume uploaded (demo): {resume_id}")
+            logger.info("✅ Resume uploaded (demo): %s", resume_id)
             
             return ResumeUploadResponse(
                 resume_id=resume_id,
@@ -310,22 +485,20 @@ async def upload_resume(
         
         # Production: Upload to storage and database
         # Upload to storage
-        storage = StorageService(db.admin_client)
-        file_path, public_url = await storage.upload_resume(user_id, file)
+        file_path, public_url = await storage_service.upload_resume(user_id, file, file_extension)
         
         # Create resume record
         resume_data = {
             "seeker_id": user_id,
             "file_path": file_path,
             "file_name": file.filename,
-            "uploaded_at": datetime.now().isoformat(),
             "is_primary": True  # First upload is primary
         }
         
-        response = db.admin_client.table("resumes").insert(resume_data).execute()
+        response = await run_db(db.admin_client.table("resumes").insert(resume_data).execute)
         resume_id = response.data[0]["id"]
         
-        logger.info(f"✅ Resume uploaded: {resume_id}")
+        logger.info("✅ Resume uploaded: %s", resume_id)
         
         return ResumeUploadResponse(
             resume_id=resume_id,
@@ -338,10 +511,17 @@ async def upload_resume(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Resume upload failed: {e}")
+        logger.error("❌ Resume upload failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Users with a parse currently in flight. The transient 'parsing' state
+# used to be written to (and later overwritten in) seeker_profiles on
+# every parse; in-memory tracking serves the status endpoint without
+# those two extra writes. Single-process state, like the parse cache.
+_parsing_users: set = set()
+
+
 @app.post("/api/resume/parse", response_model=ResumeParseResponse)
 async def parse_resume(
     resume_id: str,
@@ -370,11 +550,11 @@ async def parse_resume(
     - User reviews and confirms via /api/resume/confirm
     """
     try:
-        logger.info(f"🤖 Resume parsing started for resume {resume_id}")
+        logger.info("🤖 Resume parsing started for resume %s", resume_id)
         
         # 🧪 DEMO MODE - Skip database lookup, use dummy data
         if DEMO_MODE and user_id.startswith('demo-'):
-            logger.info(f"🧪 DEMO MODE - Using dummy resume for parsing")
+            logger.info("🧪 DEMO MODE - Using dummy resume for parsing")
             resume_text = """
             NIKHIL SHETTY
             San Francisco, CA | (555) 123-4567 | nikhil@superhirex.com
@@ -404,76 +584,93 @@ async def parse_resume(
             BS Computer Science - State University (2019)
             GPA: 3.8/4.0
             """
+            # Demo users are not premium
+            parsed_data = await ai_service.parse_resume_text(resume_text, is_premium=False)
         else:
-            # Production: Get resume from database
-            resume_response = db.admin_client.table("resumes").select("*").eq("id", resume_id).eq("seeker_id", user_id).execute()
-            
-            if not resume_response.data:
+            # Production: resume row, seeker profile and premium flag are
+            # independent lookups - fire them concurrently so the pre-AI
+            # latency is one round-trip, not three
+            resume_response, seeker_response, profile_response = await asyncio.gather(
+                run_db(db.admin_client.table("resumes").select("*").eq("id", resume_id).eq("seeker_id", user_id).maybe_single().execute),
+                run_db(db.admin_client.table("seeker_profiles").select("*").eq("user_id", user_id).maybe_single().execute),
+                run_db(db.admin_client.table("profiles").select("is_premium").eq("id", user_id).maybe_single().execute)
+            )
+
+            if not resume_response or not resume_response.data:
                 raise HTTPException(status_code=404, detail="Resume not found")
-            
-            resume = resume_response.data[0]
-            
+
+            resume = resume_response.data
+            profile = profile_response.data if profile_response else None
+            seeker_row = seeker_response.data if seeker_response else None
+            is_premium = profile.get("is_premium", False) if profile else False
+
             # Check if already parsed (prevent duplicate AI calls)
-            seeker_response = db.admin_client.table("seeker_profiles").select("*").eq("user_id", user_id).execute()
-            
-            if seeker_response.data and seeker_response.data[0].get("resume_status") in ["parsed", "confirmed"]:
+            if seeker_row and seeker_row.get("resume_status") in ["parsed", "confirmed"]:
                 # Already parsed, return cached data
-                logger.info(f"✅ Using cached parse result for resume {resume_id}")
+                logger.info("✅ Using cached parse result for resume %s", resume_id)
                 return ResumeParseResponse(
                     resume_id=resume_id,
                     status=ResumeStatus.PARSED,
-                    parsed_data=ParsedResumeData(**seeker_response.data[0]["parsed_data"]),
+                    # model_construct: this payload was validated when it
+                    # was written, skip re-validating it every request
+                    parsed_data=ParsedResumeData.model_construct(**seeker_row["parsed_data"]),
                     message="Resume already parsed (using cached result)"
                 )
             
-            # Update status to parsing
-            db.admin_client.table("seeker_profiles").update({
-                "resume_status": ResumeStatus.PARSING.value
-            }).eq("user_id", user_id).execute()
-            
+            # Mark the parse in flight (in memory - no DB write; cleared
+            # in the finally below)
+            _parsing_users.add(user_id)
+
             # Download resume file
-            storage = StorageService(db.admin_client)
             file_path = resume["file_path"]
-            
-            # Get file content from storage
-            file_content = db.admin_client.storage.from_("resumes").download(file_path)
-            
-            # Extract text from file
-            # Note: We need to convert bytes to UploadFile-like object for extraction
-            import io
-            from fastapi import UploadFile
-            
-            file_obj = UploadFile(
-                filename=resume["file_name"],
-                file=io.BytesIO(file_content)
-            )
-            
-            resume_text = await FileProcessor.extract_text_from_resume(file_obj)
-        
-        # Check if user is premium
-        if not DEMO_MODE or not user_id.startswith('demo-'):
-            profile_response = db.admin_client.table("profiles").select("is_premium").eq("id", user_id).execute()
-            is_premium = profile_response.data[0].get("is_premium", False) if profile_response.data else False
-        else:
-            is_premium = False  # Demo users are not premium
-        
-        # Parse with AI (THIS IS THE EXPENSIVE OPERATION)
-        parsed_data = await ai_service.parse_resume_text(resume_text, is_premium=is_premium)
-        
+
+            # Get file content from storage (blocking network read - run
+            # in a worker thread, the event loop stays free)
+            file_content = await run_db(db.admin_client.storage.from_("resumes").download, file_path)
+
+            # CREDIT PROTECTION: a byte-identical file reuses the stored
+            # parse - no text extraction, no GPT call
+            parsed_data = await ai_service.get_file_cached_parse(file_content, is_premium=is_premium)
+
+            if parsed_data is not None:
+                logger.info("✅ File-hash cache hit for resume %s, skipping extraction and parse", resume_id)
+            else:
+                # Extract text from file
+                # Note: We need to convert bytes to UploadFile-like object for extraction
+                import io
+                from fastapi import UploadFile
+
+                file_obj = UploadFile(
+                    filename=resume["file_name"],
+                    file=io.BytesIO(file_content)
+                )
+
+                resume_text = await FileProcessor.extract_text_from_resume(file_obj)
+
+                # Parse with AI (THIS IS THE EXPENSIVE OPERATION)
+                parsed_data = await ai_service.parse_resume_text(resume_text, is_premium=is_premium)
+
+                # Cache under the file hash so identical uploads skip
+                # extraction next time too - but never cache the failure
+                # placeholder, or one transient API error would poison
+                # this file's parse for every future upload
+                if parsed_data.name != "Parsing Failed":
+                    await ai_service.store_file_cached_parse(file_content, parsed_data, is_premium=is_premium)
+
         # Store parsed data in database (skip for demo)
         if not DEMO_MODE or not user_id.startswith('demo-'):
-            db.admin_client.table("seeker_profiles").update({
+            await run_db(db.admin_client.table("seeker_profiles").update({
                 "parsed_data": parsed_data.model_dump(),
                 "ats_score": parsed_data.ats_score,
                 "resume_status": ResumeStatus.PARSED.value
-            }).eq("user_id", user_id).execute()
-            
+            }, returning="minimal").eq("user_id", user_id).execute)
+
             # Update resume record
-            db.admin_client.table("resumes").update({
+            await run_db(db.admin_client.table("resumes").update({
                 "parsed_at": datetime.now().isoformat()
-            }).eq("id", resume_id).execute()
+            }, returning="minimal").eq("id", resume_id).execute)
         
-        logger.info(f"✅ Resume parsed and cached for resume {resume_id}")
+        logger.info("✅ Resume parsed and cached for resume %s", resume_id)
         
         return ResumeParseResponse(
             resume_id=resume_id,
@@ -485,15 +682,17 @@ async def parse_resume(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Resume parsing failed: {e}")
+        logger.error("❌ Resume parsing failed: %s", e)
         
         # Update status to failed (skip for demo)
         if not DEMO_MODE or not user_id.startswith('demo-'):
-            db.admin_client.table("seeker_profiles").update({
+            await run_db(db.admin_client.table("seeker_profiles").update({
                 "resume_status": ResumeStatus.FAILED.value
-            }).eq("user_id", user_id).execute()
-        
+            }, returning="minimal").eq("user_id", user_id).execute)
+
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        _parsing_users.discard(user_id)
 
 
 @app.put("/api/resume/confirm", response_model=SeekerProfileResponse)
@@ -515,7 +714,7 @@ async def confirm_resume_data(
     5. User can now swipe on jobs
     """
     try:
-        logger.info(f"✅ Resume confirmation for user {user_id}")
+        logger.info("✅ Resume confirmation for user %s", user_id)
         
         confirmed_data = confirm_request.confirmed_data
         
@@ -528,23 +727,22 @@ async def confirm_resume_data(
             "skills": confirmed_data.skills,
             "ats_score": confirmed_data.ats_score,
             "parsed_data": confirmed_data.model_dump(),
-            "resume_status": ResumeStatus.CONFIRMED.value,
-            "updated_at": datetime.now().isoformat()
+            "resume_status": ResumeStatus.CONFIRMED.value
         }
         
-        response = db.admin_client.table("seeker_profiles").update(update_data).eq("user_id", user_id).execute()
+        response = await run_db(db.admin_client.table("seeker_profiles").update(update_data).eq("user_id", user_id).execute)
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Seeker profile not found")
         
-        logger.info(f"✅ Profile confirmed and activated for user {user_id}")
+        logger.info("✅ Profile confirmed and activated for user %s", user_id)
         
         return response.data[0]
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Resume confirmation failed: {e}")
+        logger.error("❌ Resume confirmation failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -552,23 +750,92 @@ async def confirm_resume_data(
 async def get_resume_status(user_id: str = Depends(get_current_user_id)):
     """Get resume processing status for job seeker."""
     try:
-        response = db.admin_client.table("seeker_profiles").select("resume_status, ats_score").eq("user_id", user_id).execute()
-        
-        if not response.data:
+        # In-flight parses are tracked in memory (see parse_resume) -
+        # the transient state never touches the DB
+        if user_id in _parsing_users:
+            return {"status": ResumeStatus.PARSING.value, "ats_score": None}
+
+        if db.pool:
+            row = await db.pool.fetchrow(_RESUME_STATUS_SQL, user_id)
+            if not row:
+                return {"status": "no_resume", "ats_score": None}
+            return {
+                "status": row["resume_status"],
+                "ats_score": float(row["ats_score"]) if row["ats_score"] is not None else None
+            }
+
+        response = await run_db(db.admin_client.table("seeker_profiles").select("resume_status, ats_score").eq("user_id", user_id).maybe_single().execute)
+        row = response.data if response else None
+
+        if not row:
             return {"status": "no_resume", "ats_score": None}
-        
+
         return {
-            "status": response.data[0].get("resume_status"),
-            "ats_score": response.data[0].get("ats_score")
+            "status": row.get("resume_status"),
+            "ats_score": row.get("ats_score")
         }
     
     except Exception as e:
-        logger.error(f"❌ Get resume status failed: {e}")
+        logger.error("❌ Get resume status failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ============== Job Listing Endpoints ==============
 
+# System account that owns bulk-uploaded jobs
+_SYSTEM_ADMIN_ID = "00000000-0000-0000-0000-000000000000"
+
+# Resolved once per process (see _resolve_admin_id)
+_admin_id: Optional[str] = None
+
+
+async def _resolve_admin_id() -> str:
+    """
+    Resolve the recruiter account that owns bulk-uploaded jobs.
+
+    Cached at module level: the old code ran a select plus a racy
+    conditional insert on every bulk upload. The upsert is idempotent
+    (keyed on id), so concurrent first calls are safe, and every later
+    call is a plain attribute read.
+    """
+    global _admin_id
+    if _admin_id:
+        return _admin_id
+
+    existing = await run_db(db.admin_client.table("profiles").select("id").eq("role", "RECRUITER").limit(1).execute)
+    if existing.data:
+        _admin_id = existing.data[0]["id"]
+        return _admin_id
+
+    await run_db(db.admin_client.table("profiles").upsert({
+        "id": _SYSTEM_ADMIN_ID,
+        "user_id": _SYSTEM_ADMIN_ID,
+        "full_name": "SuperhireX Admin",
+        "email": "admin@superhirex.internal",
+        "role": "RECRUITER"
+    }, on_conflict="id", returning="minimal").execute)
+    _admin_id = _SYSTEM_ADMIN_ID
+    return _admin_id
+
+
+# One-statement bulk insert: the rows travel as a single jsonb array,
+# the database unpacks and validates them, and RETURNING reports what
+# actually landed - per-row results without per-row round-trips.
+_BULK_JOBS_SQL = """
+    INSERT INTO jobs (recruiter_id, title, company, location, salary,
+                      description, requirements, logo, status)
+    SELECT (r->>'recruiter_id')::uuid, r->>'title', r->>'company',
+           r->>'location', r->>'salary', r->>'description',
+           ARRAY(SELECT jsonb_array_elements_text(r->'requirements')),
+           r->>'logo', r->>'status'
+    FROM jsonb_array_elements($1::jsonb) AS r
+    ON CONFLICT DO NOTHING
+    RETURNING id::text AS id, recruiter_id::text AS recruiter_id, title,
+              company, location, salary, description, requirements, logo,
+              status, created_at, updated_at
+"""
+
+
 @app.post("/api/admin/jobs/bulk-upload")
 async def bulk_upload_jobs(file: UploadFile = File(...), admin_key: Optional[str] = Header(None)):
     """
@@ -594,44 +861,31 @@ async def bulk_upload_jobs(file: UploadFile = File(...), admin_key: Optional[str
         if not admin_key or admin_key != admin_key_expected:
             raise HTTPException(status_code=403, detail="Invalid or missing admin key")
         
-        # Get admin user (system user for bulk uploads)
-        admin_profile = db.admin_client.table("profiles").select("id").eq("role", "RECRUITER").limit(1).execute()
-        
-        if not admin_profile.data:
-            # Create a system admin profile if it doesn't exist
-            admin_id = "00000000-0000-0000-0000-000000000000"  # System user ID
-            admin_profile_data = {
-                "id": admin_id,
-                "user_id": admin_id,
-                "full_name": "SuperhireX Admin",
-                "email": "admin@superhirex.internal",
-                "role": "RECRUITER",
-                "created_at": datetime.now().isoformat()
-            }
-            try:
-                db.admin_client.table("profiles").insert(admin_profile_data).execute()
-            except:
-                pass  # Profile might already exist
-            admin_id = admin_id
-        else:
-            admin_id = admin_profile.data[0]["id"]
-        
+        # Get admin user (system user for bulk uploads, cached per process)
+        admin_id = await _resolve_admin_id()
+
         # Parse CSV
+        import codecs
         import csv
-        import io
-        
-        content = await file.read()
-        csv_content = content.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(csv_content))
+
+        # Stream-decode straight off the upload's spooled file: rows are
+        # decoded as the reader consumes them, so peak memory is one row
+        # instead of bytes + decoded copy of the whole file
+        csv_reader = csv.DictReader(codecs.iterdecode(file.file, 'utf-8'))
         
         uploaded_jobs = []
         failed_uploads = []
-        
+        records = []
+
+        # Validate every row up front (no DB calls), collecting failures
         for row_num, row in enumerate(csv_reader, start=2):
             try:
-                # Parse requirements (comma-separated -> list)
-                requirements = [r.strip() for r in row.get('requirements', '').split(',') if r.strip()]
-                
+                # Parse requirements (comma-separated -> list) through
+                # the same canonicalization the JobBase validator applies
+                # - bulk inserts bypass the model, and match scoring
+                # counts on lowercase, deduped arrays
+                requirements = canonicalize_skills(row.get('requirements', '').split(',')) or []
+
                 job_data = {
                     "recruiter_id": admin_id,
                     "title": row.get('title', '').strip(),
@@ -640,25 +894,52 @@ async def bulk_upload_jobs(file: UploadFile = File(...), admin_key: Optional[str
                     "salary": row.get('salary', '').strip() or None,
                     "description": row.get('description', '').strip(),
                     "requirements": requirements,
-                    "logo": f"https://ui-avatars.com/api/?name={row.get('company', 'Job')}&background=random",
-                    "status": "active",
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat()
+                    "logo": _avatar_url(row.get('company', '').strip() or 'Job'),
+                    "status": "active"
                 }
-                
-                response = db.admin_client.table("jobs").insert(job_data).execute()
-                uploaded_jobs.append(response.data[0])
-                logger.info(f"✅ Job uploaded: {row.get('title')} at {row.get('company')}")
-                
+
+                # Schema requires these - reject bad rows here so one bad
+                # row can't fail the whole batch insert
+                missing = [f for f in ("title", "company", "location", "description") if not job_data[f]]
+                if missing:
+                    raise ValueError(f"Missing required field(s): {', '.join(missing)}")
+
+                records.append(job_data)
+
             except Exception as e:
                 failed_uploads.append({
                     "row": row_num,
                     "error": str(e),
                     "data": row
                 })
-                logger.error(f"❌ Row {row_num} failed: {e}")
-        
-        logger.info(f"📊 Bulk upload complete: {len(uploaded_jobs)} success, {len(failed_uploads)} failed")
+                logger.error("❌ Row %s failed: %s", row_num, e)
+
+        # One batched insert for the whole file: a 1000-row CSV costs a
+        # single round-trip and commit instead of 1000
+        if records:
+            if db.pool:
+                # Direct Postgres: jsonb array in, RETURNING out. Rows
+                # the DB skipped (conflicts, constraint misses) are
+                # diffed back into failed_uploads without extra queries.
+                import orjson
+                rows = await db.pool.fetch(_BULK_JOBS_SQL, orjson.dumps(records).decode())
+                uploaded_jobs = [dict(row) for row in rows]
+
+                if len(uploaded_jobs) < len(records):
+                    inserted = {(j["title"], j["company"]) for j in uploaded_jobs}
+                    for rec in records:
+                        if (rec["title"], rec["company"]) not in inserted:
+                            failed_uploads.append({
+                                "row": None,
+                                "error": "Rejected by database (duplicate or constraint violation)",
+                                "data": {"title": rec["title"], "company": rec["company"]}
+                            })
+            else:
+                response = await run_db(db.admin_client.table("jobs").insert(records).execute)
+                uploaded_jobs = response.data or []
+            logger.info("✅ Batch inserted %s jobs", len(uploaded_jobs))
+
+        logger.info("📊 Bulk upload complete: %s success, %s failed", len(uploaded_jobs), len(failed_uploads))
         
         return {
             "uploaded": len(uploaded_jobs),
@@ -670,7 +951,7 @@ async def bulk_upload_jobs(file: UploadFile = File(...), admin_key: Optional[str
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Bulk job upload failed: {e}")
+        logger.error("❌ Bulk job upload failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -688,12 +969,10 @@ async def create_job(
     - Logo can be URL or uploaded separately
     """
     try:
-        logger.info(f"💼 Creating job listing for recruiter {user_id}")
-        
-        # Verify user is recruiter
-        profile = db.admin_client.table("profiles").select("role").eq("id", user_id).execute()
+        logger.info("💼 Creating job listing for recruiter %s", user_id)
         
-        if not profile.data or profile.data[0]["role"] != "RECRUITER":
+        # Verify user is recruiter (cached role lookup)
+        if await get_role(user_id) != "RECRUITER":
             raise HTTPException(status_code=403, detail="Only recruiters can create jobs")
         
         job_data = {
@@ -704,22 +983,20 @@ async def create_job(
             "salary": job.salary,
             "description": job.description,
             "requirements": job.requirements,
-            "logo": job.logo or f"https://ui-avatars.com/api/?name={job.company}&background=random",
-            "status": "active",
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
+            "logo": job.logo or _avatar_url(job.company),
+            "status": "active"
         }
         
-        response = db.admin_client.table("jobs").insert(job_data).execute()
+        response = await run_db(db.admin_client.table("jobs").insert(job_data).execute)
         
-        logger.info(f"✅ Job created: {response.data[0]['id']}")
+        logger.info("✅ Job created: %s", response.data[0]['id'])
         
         return response.data[0]
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Job creation failed: {e}")
+        logger.error("❌ Job creation failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -738,45 +1015,81 @@ async def get_jobs(
     
     Engineering Notes:
     - Filters out already-swiped jobs
-    - Calculates match scores using skills overlap
+    - Scores the whole feed in one batched pass (seeker skill set is
+      built once; no per-job awaits on the heuristic path)
     - Can add AI-powered ranking for premium users later
     """
     try:
-        logger.info(f"📋 Fetching job feed for user {user_id}")
-        
-        # Get user's skills for matching
-        seeker = db.admin_client.table("seeker_profiles").select("skills").eq("user_id", user_id).execute()
-        user_skills = seeker.data[0].get("skills", []) if seeker.data else []
-        
-        # Get already-swiped job IDs
-        swiped = db.admin_client.table("swipes").select("target_id").eq("swiper_id", user_id).eq("target_type", "job").execute()
-        swiped_ids = [s["target_id"] for s in swiped.data] if swiped.data else []
-        
-        # Get active jobs (excluding swiped ones)
-        query = db.admin_client.table("jobs").select("*").eq("status", "active").limit(limit + len(swiped_ids))
-        
-        response = query.execute()
-        jobs = response.data if response.data else []
-        
-        # Filter out swiped jobs and calculate match scores
-        ranked_jobs = []
-        for job in jobs:
-            if job["id"] not in swiped_ids:
-                # Calculate match score (heuristic, no AI cost)
-                match_score = ai_service.calculate_job_match_score(
-                    user_skills,
-                    job.get("requirements", [])
-                )
-                
-                # Generate match reason (heuristic, no AI cost)
-                match_reason = await ai_service.generate_match_reason(
-                    user_skills,
-                    job.get("requirements", [])
-                )
-                
-                job["match_score"] = match_score
-                job["match_reason"] = match_reason
+        logger.debug("📋 Fetching job feed for user %s", user_id)
+        
+        if db.pool and not settings.use_semantic_matching:
+            # Direct Postgres: the database filters, scores and ranks the
+            # feed in one query - Python just formats match reasons for
+            # the rows that come back
+            skills_row = await db.pool.fetchrow(_SEEKER_SKILLS_SQL, user_id)
+            user_skills = list(skills_row["skills"]) if skills_row and skills_row["skills"] else []
+            rows = await db.pool.fetch(_JOB_FEED_SQL, user_id, user_skills, limit)
+
+            ranked_jobs = []
+            for row in rows:
+                job = dict(row)
+                overlap = frozenset(job.pop("overlap_skills") or ())
+                job["match_score"] = float(job["match_score"])
+                job["match_reason"] = ai_service.generate_match_reason(overlap)
                 ranked_jobs.append(job)
+
+            logger.info("✅ Returning %s jobs for user %s (SQL-ranked)", len(ranked_jobs), user_id)
+            return ranked_jobs
+        else:
+            # Get user's skills for matching
+            seeker = await run_db(db.admin_client.table("seeker_profiles").select("skills").eq("user_id", user_id).maybe_single().execute)
+            user_skills = (seeker.data or {}).get("skills", []) if seeker else []
+
+            # Get already-swiped job IDs
+            swiped = await run_db(db.admin_client.table("swipes").select("target_id").eq("swiper_id", user_id).eq("target_type", "job").execute)
+            swiped_ids = [s["target_id"] for s in swiped.data or ()]
+
+            # Get active jobs, excluding swiped ones server-side: the DB does
+            # the anti-join and ships only rows the user can actually see.
+            # Over-fetch 3x the limit to leave headroom for ranking.
+            query = db.admin_client.table("jobs").select("*").eq("status", "active")
+            if swiped_ids:
+                query = query.not_.in_("id", swiped_ids)
+            response = await run_db(query.order("created_at", desc=True).limit(limit * 3).execute)
+            ranked_jobs = response.data if response.data else []
+
+        # New signups have no skills yet: every job scores the same
+        # neutral 50, so skip the per-job scoring loop entirely
+        if not user_skills:
+            ranked_jobs = ranked_jobs[:limit]
+            reason = ai_service.generate_match_reason(frozenset())
+            for job in ranked_jobs:
+                job["match_score"] = 50.0
+                job["match_reason"] = reason
+            logger.info("✅ Returning %s jobs for user %s (no skills yet)", len(ranked_jobs), user_id)
+            return ranked_jobs
+
+        # Score the whole batch in one pass. The seeker set is built
+        # once; each job costs one intersection that feeds both the
+        # score and the match reason.
+        seeker_set = frozenset(user_skills)
+        job_sets = [frozenset(job.get("requirements") or []) for job in ranked_jobs]
+
+        if settings.use_semantic_matching:
+            scores = await ai_service.score_jobs_semantic(
+                user_skills,
+                [job.get("requirements", []) for job in ranked_jobs]
+            )
+            overlaps = [seeker_set & job_set for job_set in job_sets]
+        else:
+            matches = [ai_service.calculate_job_match(seeker_set, job_set) for job_set in job_sets]
+            scores = [score for score, _ in matches]
+            overlaps = [overlap for _, overlap in matches]
+
+        for job, match_score, overlap in zip(ranked_jobs, scores, overlaps):
+            job["match_score"] = match_score
+            # Match reason is pure formatting of the overlap (no AI cost)
+            job["match_reason"] = ai_service.generate_match_reason(overlap)
         
         # Sort by match score (highest first)
         ranked_jobs.sort(key=lambda x: x["match_score"], reverse=True)
@@ -784,12 +1097,12 @@ async def get_jobs(
         # Limit results
         ranked_jobs = ranked_jobs[:limit]
         
-        logger.info(f"✅ Returning {len(ranked_jobs)} jobs for user {user_id}")
+        logger.info("✅ Returning %s jobs for user %s", len(ranked_jobs), user_id)
         
         return ranked_jobs
     
     except Exception as e:
-        logger.error(f"❌ Get jobs failed: {e}")
+        logger.error("❌ Get jobs failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -800,17 +1113,17 @@ async def get_job(
 ):
     """Get single job details."""
     try:
-        response = db.admin_client.table("jobs").select("*").eq("id", job_id).execute()
-        
-        if not response.data:
+        response = await run_db(db.admin_client.table("jobs").select("*").eq("id", job_id).maybe_single().execute)
+
+        if not response or not response.data:
             raise HTTPException(status_code=404, detail="Job not found")
-        
-        return response.data[0]
+
+        return response.data
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Get job failed: {e}")
+        logger.error("❌ Get job failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -822,27 +1135,25 @@ async def update_job(
 ):
     """Update job listing (recruiter only, own jobs only)."""
     try:
-        # Verify ownership
-        job = db.admin_client.table("jobs").select("recruiter_id").eq("id", job_id).execute()
-        
-        if not job.data:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        if job.data[0]["recruiter_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized to update this job")
-        
-        # Update job
         update_data = {k: v for k, v in job_update.model_dump().items() if v is not None}
-        update_data["updated_at"] = datetime.now().isoformat()
-        
-        response = db.admin_client.table("jobs").update(update_data).eq("id", job_id).execute()
-        
+
+        # Ownership check folded into the UPDATE filter: one round-trip
+        # on the happy path instead of SELECT-then-UPDATE
+        response = await run_db(db.admin_client.table("jobs").update(update_data).eq("id", job_id).eq("recruiter_id", user_id).execute)
+
+        if not response.data:
+            # Failure path only: distinguish missing job from foreign job
+            job = await run_db(db.admin_client.table("jobs").select("id").eq("id", job_id).maybe_single().execute)
+            if not job or not job.data:
+                raise HTTPException(status_code=404, detail="Job not found")
+            raise HTTPException(status_code=403, detail="Not authorized to update this job")
+
         return response.data[0]
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Update job failed: {e}")
+        logger.error("❌ Update job failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -853,27 +1164,25 @@ async def delete_job(
 ):
     """Delete job listing (recruiter only, own jobs only)."""
     try:
-        # Verify ownership
-        job = db.admin_client.table("jobs").select("recruiter_id").eq("id", job_id).execute()
-        
-        if not job.data:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        if job.data[0]["recruiter_id"] != user_id:
+        # Soft delete with the ownership check folded into the UPDATE
+        # filter - single round-trip when the caller owns the job
+        response = await run_db(db.admin_client.table("jobs").update({
+            "status": "closed"
+        }).eq("id", job_id).eq("recruiter_id", user_id).execute)
+
+        if not response.data:
+            # Failure path only: distinguish missing job from foreign job
+            job = await run_db(db.admin_client.table("jobs").select("id").eq("id", job_id).maybe_single().execute)
+            if not job or not job.data:
+                raise HTTPException(status_code=404, detail="Job not found")
             raise HTTPException(status_code=403, detail="Not authorized to delete this job")
-        
-        # Soft delete (set status to closed)
-        db.admin_client.table("jobs").update({
-            "status": "closed",
-            "updated_at": datetime.now().isoformat()
-        }).eq("id", job_id).execute()
-        
+
         return {"message": "Job deleted successfully"}
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Delete job failed: {e}")
+        logger.error("❌ Delete job failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -898,63 +1207,90 @@ async def get_candidates(
     - Can add AI ranking for premium recruiters later
     """
     try:
-        logger.info(f"👥 Fetching candidate feed for recruiter {user_id}")
-        
-        # Verify user is recruiter
-        profile = db.admin_client.table("profiles").select("role").eq("id", user_id).execute()
+        logger.debug("👥 Fetching candidate feed for recruiter %s", user_id)
         
-        if not profile.data or profile.data[0]["role"] != "RECRUITER":
-            raise HTTPException(status_code=403, detail="Only recruiters can view candidates")
-        
-        # Get already-swiped candidate IDs
-        swiped = db.admin_client.table("swipes").select("target_id").eq("swiper_id", user_id).eq("target_type", "candidate").execute()
-        swiped_ids = [s["target_id"] for s in swiped.data] if swiped.data else []
-        
-        # Get active candidates (confirmed profiles only)
-        query = db.admin_client.table("seeker_profiles").select("*, profiles!inner(full_name, email)").eq("resume_status", "confirmed").limit(limit + len(swiped_ids))
-        
-        response = query.execute()
-        candidates_raw = response.data if response.data else []
+        if db.pool:
+            # Role gate still applies; the swipe exclusion happens in
+            # the anti-join, so no swipe history is fetched at all
+            if await get_role(user_id) != "RECRUITER":
+                raise HTTPException(status_code=403, detail="Only recruiters can view candidates")
+
+            rows = await db.pool.fetch(_CANDIDATE_FEED_SQL, user_id, limit)
+            candidates_raw = [
+                {**dict(row), "profiles": {"full_name": row["full_name"]}}
+                for row in rows
+            ]
+        else:
+            # Role check (cached) and swipe history are independent -
+            # fetch together; at steady state the role resolves without
+            # a query
+            role, swiped = await asyncio.gather(
+                get_role(user_id),
+                run_db(db.admin_client.table("swipes").select("target_id").eq("swiper_id", user_id).eq("target_type", "candidate").execute)
+            )
+
+            if role != "RECRUITER":
+                raise HTTPException(status_code=403, detail="Only recruiters can view candidates")
+
+            swiped_ids = [s["target_id"] for s in swiped.data or ()]
+
+            # Already-swiped candidates are excluded server-side, so
+            # exactly `limit` visible rows ship over the wire instead of
+            # O(swipe history) rows filtered in Python
+            # Project only the columns the candidate card uses - "*"
+            # would drag parsed_data blobs and other dead weight across
+            # the wire
+            query = db.admin_client.table("seeker_profiles").select(
+                "id, user_id, title, bio, location, experience, skills, ats_score, profiles!inner(full_name)"
+            ).eq("resume_status", "confirmed")
+            if swiped_ids:
+                query = query.not_.in_("id", swiped_ids)
+            response = await run_db(query.limit(limit).execute)
+
+            candidates_raw = response.data if response.data else []
         
-        # Transform to CandidateResponse format
+        # Transform to CandidateResponse format (already filtered and
+        # limited by the database)
         candidates = []
         for c in candidates_raw:
-            if c["id"] not in swiped_ids:
-                profile_data = c.get("profiles", {})
-                
-                candidate = {
-                    "id": c["id"],
-                    "user_id": c["user_id"],
-                    "name": profile_data.get("full_name", "Anonymous"),
-                    "title": c.get("title"),
-                    "location": c.get("location"),
-                    "experience": c.get("experience"),
-                    "skills": c.get("skills", []),
-                    "bio": c.get("bio"),
-                    "avatar": f"https://ui-avatars.com/api/?name={profile_data.get('full_name', 'User')}&background=random",
-                    "ats_score": c.get("ats_score"),
-                    "match_score": 80.0,  # Heuristic score (can add real matching later)
-                    "match_reason": "Strong profile with relevant experience."
-                }
-                
-                candidates.append(candidate)
-        
-        # Limit results
-        candidates = candidates[:limit]
-        
-        logger.info(f"✅ Returning {len(candidates)} candidates for recruiter {user_id}")
+            profile_data = c.get("profiles", {})
+
+            candidate = {
+                "id": c["id"],
+                "user_id": c["user_id"],
+                "name": profile_data.get("full_name", "Anonymous"),
+                "title": c.get("title"),
+                "location": c.get("location"),
+                "experience": c.get("experience"),
+                "skills": c.get("skills", []),
+                "bio": c.get("bio"),
+                "avatar": _avatar_url(profile_data.get('full_name') or 'User'),
+                "ats_score": c.get("ats_score"),
+                "match_score": 80.0,  # Heuristic score (can add real matching later)
+                "match_reason": "Strong profile with relevant experience."
+            }
+
+            candidates.append(candidate)
+
+        logger.info("✅ Returning %s candidates for recruiter %s", len(candidates), user_id)
         
         return candidates
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Get candidates failed: {e}")
+        logger.error("❌ Get candidates failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ============== Swipe Endpoints ==============
 
+# Cleared if the record_swipe_and_match function is missing from the
+# database (schema.sql not applied yet) so the multi-query fallback is
+# used without retrying the RPC on every swipe
+_swipe_rpc_available = True
+
+
 @app.post("/api/swipe", response_model=SwipeResponse)
 async def record_swipe(
     swipe: SwipeRequest,
@@ -973,91 +1309,124 @@ async def record_swipe(
     - Swipes are immutable once recorded
     - Matches detected automatically on right swipes
     - No AI cost per swipe (all heuristic)
+    - Swipe + match detection run atomically in one DB transaction via
+      the record_swipe_and_match function (see schema.sql); the
+      multi-query flow below is the fallback when it isn't deployed
     """
+    global _swipe_rpc_available
     try:
-        logger.info(f"👆 Recording swipe: user={user_id}, target={swipe.target_id}, direction={swipe.direction}")
-        
+        logger.debug("👆 Recording swipe: user=%s, target=%s, direction=%s", user_id, swipe.target_id, swipe.direction)
+
+        if _swipe_rpc_available:
+            try:
+                result = await run_db(db.admin_client.rpc("record_swipe_and_match", {
+                    "p_swiper_id": user_id,
+                    "p_target_id": swipe.target_id,
+                    "p_target_type": swipe.target_type.value,
+                    "p_direction": swipe.direction.value
+                }).execute)
+
+                row = result.data[0]
+                logger.info("✅ Swipe recorded (match=%s)", row["is_match"])
+                return SwipeResponse(
+                    swipe_id=row["swipe_id"],
+                    is_match=row["is_match"],
+                    match_id=row["match_id"],
+                    message="Match! 🎉" if row["is_match"] else "Swipe recorded"
+                )
+            except Exception as e:
+                # PGRST202: function not found - schema.sql migration
+                # hasn't been applied, use the multi-query flow from here on
+                if getattr(e, "code", None) != "PGRST202":
+                    raise
+                logger.warning("⚠️ record_swipe_and_match RPC missing, using multi-query fallback")
+                _swipe_rpc_available = False
+
         # Record swipe
         swipe_data = {
             "swiper_id": user_id,
             "target_id": swipe.target_id,
             "target_type": swipe.target_type.value,
-            "direction": swipe.direction.value,
-            "created_at": datetime.now().isoformat()
+            "direction": swipe.direction.value
         }
         
-        swipe_response = db.admin_client.table("swipes").insert(swipe_data).execute()
+        swipe_response = await run_db(db.admin_client.table("swipes").insert(swipe_data).execute)
         swipe_id = swipe_response.data[0]["id"]
-        
-        # Check for match if right swipe
+
+        # Left swipes are the common case and can never match - return
+        # before any reciprocal logic
+        if swipe.direction.value != "right":
+            logger.info("✅ Swipe recorded (match=False)")
+            return SwipeResponse(
+                swipe_id=swipe_id,
+                is_match=False,
+                match_id=None,
+                message="Swipe recorded"
+            )
+
+        # Right swipe: look for a reciprocal swipe
+        # If seeker swiped right on job, check if recruiter (job owner) swiped right on seeker
+        # If recruiter swiped right on candidate, check if candidate swiped right on any of recruiter's jobs
         is_match = False
         match_id = None
-        
-        if swipe.direction.value == "right":
-            # Look for reciprocal swipe
-            # If seeker swiped right on job, check if recruiter (job owner) swiped right on seeker
-            # If recruiter swiped right on candidate, check if candidate swiped right on any of recruiter's jobs
-            
-            reciprocal = None
-            
-            if swipe.target_type == "job":
-                # Seeker swiped right on job
-                # Check if job's recruiter swiped right on this seeker
-                job = db.admin_client.table("jobs").select("recruiter_id").eq("id", swipe.target_id).execute()
-                if job.data:
-                    recruiter_id = job.data[0]["recruiter_id"]
-                    reciprocal = db.admin_client.table("swipes").select("*").eq("swiper_id", recruiter_id).eq("target_id", user_id).eq("target_type", "candidate").eq("direction", "right").execute()
-            
-            elif swipe.target_type == "candidate":
-                # Recruiter swiped right on candidate
-                # Check if candidate swiped right on any of this recruiter's jobs
-                recruiter_jobs = db.admin_client.table("jobs").select("id").eq("recruiter_id", user_id).execute()
-                job_ids = [j["id"] for j in recruiter_jobs.data] if recruiter_jobs.data else []
-                
-                if job_ids:
-                    # Check if candidate swiped right on any of these jobs
-                    for job_id in job_ids:
-                        candidate_swipe = db.admin_client.table("swipes").select("*").eq("swiper_id", swipe.target_id).eq("target_id", job_id).eq("target_type", "job").eq("direction", "right").execute()
-                        
-                        if candidate_swipe.data:
-                            reciprocal = candidate_swipe
-                            # Create match with this specific job
-                            match_data = {
-                                "seeker_id": swipe.target_id,
-                                "recruiter_id": user_id,
-                                "job_id": job_id,
-                                "matched_at": datetime.now().isoformat(),
-                                "status": "active"
-                            }
-                            
-                            match_response = db.admin_client.table("matches").insert(match_data).execute()
-                            match_id = match_response.data[0]["id"]
-                            is_match = True
-                            break
-            
-            if reciprocal and reciprocal.data and not is_match:
-                # Found reciprocal match
-                is_match = True
-                
-                # Create match record (if not already created above)
-                if swipe.target_type == "job":
-                    # Match between seeker and recruiter for this job
-                    job = db.admin_client.table("jobs").select("recruiter_id").eq("id", swipe.target_id).execute()
-                    
+
+        if swipe.target_type == "job":
+            # Seeker swiped right on job
+            # Check if job's recruiter swiped right on this seeker.
+            # The set_swipes_recruiter_id trigger stamps the job's
+            # recruiter onto the swipe row, so the insert response
+            # usually carries it; query jobs only when the swipes
+            # migration hasn't been applied
+            recruiter_id = swipe_response.data[0].get("recruiter_id")
+            if recruiter_id is None:
+                job = await run_db(db.admin_client.table("jobs").select("recruiter_id").eq("id", swipe.target_id).maybe_single().execute)
+                recruiter_id = job.data["recruiter_id"] if job and job.data else None
+
+            if recruiter_id:
+                # Existence only: HEAD request with count=exact - the
+                # index answers it and no row payload crosses the wire
+                reciprocal = await run_db(db.admin_client.table("swipes").select("id", count="exact", head=True).eq("swiper_id", recruiter_id).eq("target_id", user_id).eq("target_type", "candidate").eq("direction", "right").execute)
+
+                if reciprocal.count:
                     match_data = {
                         "seeker_id": user_id,
-                        "recruiter_id": job.data[0]["recruiter_id"],
+                        "recruiter_id": recruiter_id,
                         "job_id": swipe.target_id,
-                        "matched_at": datetime.now().isoformat(),
                         "status": "active"
                     }
-                    
-                    match_response = db.admin_client.table("matches").insert(match_data).execute()
+
+                    match_response = await run_db(db.admin_client.table("matches").insert(match_data).execute)
                     match_id = match_response.data[0]["id"]
-        
+                    is_match = True
+
+        elif swipe.target_type == "candidate":
+            # Recruiter swiped right on candidate
+            # Check if candidate swiped right on any of this recruiter's jobs
+            recruiter_jobs = await run_db(db.admin_client.table("jobs").select("id").eq("recruiter_id", user_id).execute)
+            job_ids = [j["id"] for j in recruiter_jobs.data] if recruiter_jobs.data else []
+
+            if job_ids:
+                # One IN query over all of the recruiter's jobs
+                # instead of a SELECT per job (classic N+1) - the
+                # first hit is the matching job
+                candidate_swipe = await run_db(db.admin_client.table("swipes").select("target_id").eq("swiper_id", swipe.target_id).eq("target_type", "job").eq("direction", "right").in_("target_id", job_ids).limit(1).execute)
+
+                if candidate_swipe.data:
+                    # Create match with the job the candidate swiped
+                    match_data = {
+                        "seeker_id": swipe.target_id,
+                        "recruiter_id": user_id,
+                        "job_id": candidate_swipe.data[0]["target_id"],
+                        "status": "active"
+                    }
+
+                    match_response = await run_db(db.admin_client.table("matches").insert(match_data).execute)
+                    match_id = match_response.data[0]["id"]
+                    is_match = True
+
         message = "Match! 🎉" if is_match else "Swipe recorded"
         
-        logger.info(f"✅ Swipe recorded (match={is_match})")
+        logger.info("✅ Swipe recorded (match=%s)", is_match)
         
         return SwipeResponse(
             swipe_id=swipe_id,
@@ -1067,7 +1436,7 @@ async def record_swipe(
         )
     
     except Exception as e:
-        logger.error(f"❌ Record swipe failed: {e}")
+        logger.error("❌ Record swipe failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1077,26 +1446,39 @@ async def record_swipe(
 async def get_matches(user_id: str = Depends(get_current_user_id)):
     """Get all matches for current user."""
     try:
-        # Get user role
-        profile = db.admin_client.table("profiles").select("role").eq("id", user_id).execute()
-        
-        if not profile.data:
+        # Get user role (cached)
+        role = await get_role(user_id)
+
+        if role is None:
             raise HTTPException(status_code=404, detail="Profile not found")
-        
-        role = profile.data[0]["role"]
-        
-        # Query matches based on role
+
+        # Query matches based on role, projecting only what MatchResponse
+        # ships. The embedded rows are renamed onto job_details /
+        # seeker_profile below; the old "*"-embeds (including recruiter
+        # profiles) were fetched and then silently dropped by
+        # response-model filtering.
+        match_cols = "id, seeker_id, recruiter_id, job_id, matched_at, status"
+        job_cols = "jobs(id, recruiter_id, title, company, location, salary, description, requirements, logo, status, created_at, updated_at)"
+        seeker_cols = "seeker_profiles(id, user_id, title, bio, location, experience, skills, ats_score, resume_status, created_at, updated_at)"
+
         if role == "SEEKER":
-            query = db.admin_client.table("matches").select("*, jobs(*), profiles!matches_recruiter_id_fkey(*)").eq("seeker_id", user_id).eq("status", "active")
+            query = db.admin_client.table("matches").select(f"{match_cols}, {job_cols}").eq("seeker_id", user_id).eq("status", "active")
         else:
-            query = db.admin_client.table("matches").select("*, jobs(*), profiles!matches_seeker_id_fkey(*), seeker_profiles(*)").eq("recruiter_id", user_id).eq("status", "active")
-        
-        response = query.execute()
-        
-        return response.data if response.data else []
+            query = db.admin_client.table("matches").select(f"{match_cols}, {job_cols}, {seeker_cols}").eq("recruiter_id", user_id).eq("status", "active")
+
+        response = await run_db(query.execute)
+
+        matches = response.data or []
+        for m in matches:
+            m["job_details"] = m.pop("jobs", None)
+            seeker_rows = m.pop("seeker_profiles", None)
+            if seeker_rows:
+                m["seeker_profile"] = seeker_rows[0] if isinstance(seeker_rows, list) else seeker_rows
+
+        return matches
     
     except Exception as e:
-        logger.error(f"❌ Get matches failed: {e}")
+        logger.error("❌ Get matches failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1105,10 +1487,19 @@ async def get_matches(user_id: str = Depends(get_current_user_id)):
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup."""
+    # Optional direct-Postgres pool for hot read endpoints
+    await db.init_pool()
+
     logger.info("🚀 SuperhireX Backend initialized successfully")
-    logger.info(f"✅ Supabase connected: {settings.supabase_url}")
-    logger.info(f"✅ AI Service ready (OpenAI via Emergent LLM)")
-    logger.info(f"✅ CORS enabled for: {settings.frontend_url}")
+    logger.info("✅ Supabase connected: %s", settings.supabase_url)
+    logger.info("✅ AI Service ready (OpenAI via Emergent LLM)")
+    logger.info("✅ CORS enabled for: %s", settings.frontend_url)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled connections on shutdown."""
+    await db.close_pool()
 
 
 if __name__ == "__main__":